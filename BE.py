@@ -1,20 +1,129 @@
-from fastapi import FastAPI, WebSocket
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 import yfinance as yf
+import aiohttp
 import asyncio
+import json
+import time
 
-app = FastAPI()
+# --- Yahoo Finance quote endpoint, fetched over one keep-alive session
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+SESSION = None
+
+@asynccontextmanager
+async def lifespan(app):
+    """Opens the shared HTTP session for the app's lifetime."""
+    global SESSION
+    SESSION = aiohttp.ClientSession(
+        headers={"User-Agent": "Mozilla/5.0"},
+        timeout=aiohttp.ClientTimeout(total=5)
+    )
+    yield
+    await SESSION.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# --- Last fetched price per symbol: symbol -> (timestamp, price)
+PRICE_CACHE_TTL = 2
+POLL_INTERVAL = 2  # adjust interval here
+_price_cache: dict[str, tuple[float, float]] = {}
+
+async def get_ltps(symbols):
+    """
+    Returns the last traded price for each symbol, fetching every stale one in a single request.
+    Prices fetched within PRICE_CACHE_TTL seconds are reused.
+    """
+    now = time.time()
+    prices = {}
+    stale = []
+    for symbol in symbols:
+        cached = _price_cache.get(symbol)
+        if cached and now - cached[0] < PRICE_CACHE_TTL:
+            prices[symbol] = cached[1]
+        else:
+            stale.append(symbol)
+
+    if stale:
+        fetched = {}
+        try:
+            async with SESSION.get(QUOTE_URL, params={"symbols": ",".join(stale)}) as r:
+                r.raise_for_status()
+                data = await r.json()
+            for item in data["quoteResponse"]["result"]:
+                fetched[item["symbol"]] = item.get("regularMarketPrice", None)
+        except Exception as e:
+            print(f"[ERROR] Batch quote fetch failed: {e}")
+
+        # Fall back to yfinance for anything the quote endpoint did not return
+        missing = [symbol for symbol in stale if not fetched.get(symbol)]
+        if missing:
+            results = await asyncio.gather(*(asyncio.to_thread(info_ltp, symbol) for symbol in missing))
+            fetched.update(zip(missing, results))
+
+        for symbol, ltp in fetched.items():
+            if ltp:
+                _price_cache[symbol] = (now, ltp)
+                prices[symbol] = ltp
+    return prices
+
+def info_ltp(symbol):
+    """Fetches the last traded price for a single symbol from yf.Ticker(...).info."""
+    try:
+        return yf.Ticker(symbol).info.get("regularMarketPrice", None)
+    except Exception:
+        return None
+
+def parse_subscription(message):
+    """
+    Reads the symbols from a subscribe message.
+    Accepts {"action": "subscribe", "symbols": [...]} or a bare symbol string.
+    Returns None for any other message, which should be ignored.
+    """
+    try:
+        payload = json.loads(message)
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict):
+        if payload.get("action") == "subscribe":
+            return [str(s) for s in payload.get("symbols", [])]
+        return None
+    # Anything that isn't a JSON object (e.g. 500325 or null) is a bare symbol
+    symbol = payload.strip() if isinstance(payload, str) else message.strip()
+    return [symbol] if symbol else None
 
 @app.websocket("/ws/ltp")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Streams prices for the subscribed symbols. Each frame is a JSON object holding
+    only the {symbol: price} entries that changed since the previous frame.
+    A new subscribe message replaces the current symbol list.
+    """
     await websocket.accept()
-    symbol = await websocket.receive_text()
+    symbols = parse_subscription(await websocket.receive_text()) or []
+    last_sent: dict[str, float] = {}
 
     while True:
+        # A failed fetch only skips this tick; the subscription keeps polling
         try:
-            stock = yf.Ticker(symbol)
-            ltp = stock.info.get("regularMarketPrice", None)
-            await websocket.send_text(str(ltp) if ltp else "N/A")
-            await asyncio.sleep(2)  # adjust interval here
-        except:
-            await websocket.send_text("Error")
+            prices = await get_ltps(symbols)
+        except Exception as e:
+            print(f"[ERROR] Price fetch failed: {e}")
+            prices = {}
+
+        try:
+            changed = {s: p for s, p in prices.items() if last_sent.get(s) != p}
+            if changed:
+                await websocket.send_json(changed)
+                last_sent.update(changed)
+
+            # Wait out the interval, picking up any new subscription in the meantime
+            try:
+                message = await asyncio.wait_for(websocket.receive_text(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                continue
+        except WebSocketDisconnect:
             break
+        subscription = parse_subscription(message)
+        if subscription is not None:
+            symbols = subscription
+            last_sent = {s: p for s, p in last_sent.items() if s in symbols}
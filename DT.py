@@ -1,44 +1,269 @@
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 import yfinance as yf
 import pandas as pd
+import numpy as np
 import os
 import json
+import orjson
+import tempfile
 import plotly.graph_objects as go
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from lxml import html
+from html import escape as html_escape
 import time
 import threading
+import concurrent.futures
 import asyncio
 import websockets
-import requests
 
 
 # --- Paths for saving persistent data
+STATE_FILE = "state.json"
+# Older saves kept portfolio and balance in separate files; these are only read to migrate
 PORTFOLIO_FILE = "portfolio_data.json"
 BALANCE_FILE = "balance_data.txt"
 LIMIT_ORDER_FILE = "limit_orders.json"
 
+# --- Upper bound on points sent to the browser per chart trace
+MAX_CHART_POINTS = 1000
+
+# --- Live price channel served by BE.py
+LTP_WS_URL = "ws://127.0.0.1:8000/ws/ltp"
+LIVE_QUOTES_PER_ROW = 5  # Used to size the live price strip; rows wrap beyond this
+
+# --- Yahoo Finance batched quote endpoint
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+# Maps the yf.Ticker(...).info key used throughout the app to the quote endpoint field
+QUOTE_FIELDS = {
+    "regularMarketPrice": "regularMarketPrice",
+    "previousClose": "regularMarketPreviousClose",
+    "dayHigh": "regularMarketDayHigh",
+    "dayLow": "regularMarketDayLow",
+    "fiftyTwoWeekHigh": "fiftyTwoWeekHigh",
+    "fiftyTwoWeekLow": "fiftyTwoWeekLow",
+    "shortName": "shortName",
+}
+
+# --- Shared HTTP client: keeps connections (and TLS sessions) alive across requests and reruns
+@st.cache_resource(show_spinner=False)
+def _http_client():
+    return httpx.Client(http2=True, headers={"User-Agent": "Mozilla/5.0"}, timeout=5.0, follow_redirects=True)
+
+_HTTP = _http_client()
+
+# --- Index tickers shown in the BSE Market Summary
+index_tickers = {
+    "Sensex": "^BSESN",
+    "Sensex 50": "^NSEI", # Nifty 50 is often used as a proxy for Sensex 50 in Yahoo Finance
+    "BSE Bankex": "^BSEBANK"
+}
+
+# --- Portfolio: one row per ticker, with qty and avg_price held as columns
+PORTFOLIO_DTYPES = {"qty": "int64", "avg_price": "float64"}
+
+def empty_portfolio():
+    """Returns an empty portfolio DataFrame indexed by ticker."""
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in PORTFOLIO_DTYPES.items()})
+
+def portfolio_from_saved(saved):
+    """
+    Builds the portfolio DataFrame from its saved form.
+    Accepts the columnar {"ticker": [...], "qty": [...], "avg_price": [...]} layout
+    or the older {ticker: {"qty": ..., "avg_price": ...}} mapping.
+    """
+    if not saved:
+        return empty_portfolio()
+    if "ticker" in saved:
+        df = pd.DataFrame({"qty": saved["qty"], "avg_price": saved["avg_price"]}, index=saved["ticker"])
+    else:
+        df = pd.DataFrame.from_dict(saved, orient="index")[list(PORTFOLIO_DTYPES)]
+    return df.astype(PORTFOLIO_DTYPES)
+
+def get_holding(ticker):
+    """Returns (qty, avg_price) held for ticker, or (0, 0.0) if it isn't held."""
+    try:
+        row = st.session_state.portfolio.loc[ticker]
+    except KeyError:
+        return 0, 0.0
+    return int(row["qty"]), float(row["avg_price"])
+
+def set_holding(ticker, qty, avg_price):
+    """Updates ticker's row in place, adding it if new and dropping it once qty reaches zero."""
+    portfolio = st.session_state.portfolio
+    if qty <= 0:
+        st.session_state.portfolio = portfolio.drop(index=ticker, errors="ignore")
+    elif ticker in portfolio.index:
+        portfolio.loc[ticker, "qty"] = qty
+        portfolio.loc[ticker, "avg_price"] = avg_price
+    else:
+        portfolio.loc[ticker] = [qty, avg_price]
+        st.session_state.portfolio = portfolio.astype(PORTFOLIO_DTYPES)  # Enlargement upcasts qty
+
 # --- Helper: Save session data
 def save_session():
-    """Saves the current portfolio and balance to respective files."""
-    with open(PORTFOLIO_FILE, "w") as f:
-        json.dump(st.session_state.portfolio, f)
-    with open(BALANCE_FILE, "w") as f:
-        f.write(str(st.session_state.balance))
+    """
+    Saves the current portfolio and balance to STATE_FILE in one atomic write.
+    Skips serializing and writing when the state matches what was last saved.
+    """
+    portfolio = st.session_state.portfolio
+    columns = {
+        "ticker": portfolio.index.tolist(),
+        "qty": portfolio["qty"].tolist(),
+        "avg_price": portfolio["avg_price"].tolist()
+    }
+    # Holdings are sorted so that row order doesn't change the hash
+    state_hash = hash((
+        tuple(sorted(zip(columns["ticker"], columns["qty"], columns["avg_price"]))),
+        st.session_state.balance
+    ))
+    if st.session_state.get("_last_saved_hash") == state_hash:
+        return
+
+    payload = orjson.dumps({
+        "portfolio": columns,
+        "balance": st.session_state.balance
+    })
+
+    # Write to a temporary file and swap it in, so a crash never leaves a partial file
+    state_dir = os.path.dirname(os.path.abspath(STATE_FILE))
+    with tempfile.NamedTemporaryFile("wb", dir=state_dir, delete=False) as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f.name, STATE_FILE)
+    st.session_state._last_saved_hash = state_hash
+
+def load_session():
+    """
+    Loads the saved portfolio and balance, migrating from the older two-file format if needed.
+    Returns:
+        tuple: (portfolio DataFrame, balance)
+    """
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "rb") as f:
+            state = orjson.loads(f.read())
+        return portfolio_from_saved(state["portfolio"]), state["balance"]
+
+    portfolio = {}
+    balance = 1000000.0  # ₹10 Lakhs default
+    if os.path.exists(PORTFOLIO_FILE):
+        with open(PORTFOLIO_FILE, "r") as f:
+            portfolio = json.load(f)
+    if os.path.exists(BALANCE_FILE):
+        with open(BALANCE_FILE, "r") as f:
+            balance = float(f.read())
+    return portfolio_from_saved(portfolio), balance
 
 def load_limit_orders():
-    """Loads pending limit orders from a JSON file."""
-    if os.path.exists(LIMIT_ORDER_FILE):
-        with open(LIMIT_ORDER_FILE, "r") as f:
-            return json.load(f)
-    return []
+    """
+    Loads pending limit orders from a JSON file.
+    The parsed list is kept in session state and reused until the file's mtime changes.
+    """
+    try:
+        mtime = os.stat(LIMIT_ORDER_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    cache = st.session_state.get("_limit_orders_cache")
+    if cache is None or cache["mtime"] != mtime:
+        with open(LIMIT_ORDER_FILE, "rb") as f:
+            cache = {"mtime": mtime, "data": orjson.loads(f.read())}
+        st.session_state._limit_orders_cache = cache
+    return list(cache["data"])  # Callers may append, so hand out a copy of the list
 
 def save_limit_orders(orders):
     """Saves the current list of limit orders to a JSON file."""
-    with open(LIMIT_ORDER_FILE, "w") as f:
-        json.dump(orders, f)
+    with open(LIMIT_ORDER_FILE, "wb") as f:
+        f.write(orjson.dumps(orders))
+
+# --- Fetch quotes for many symbols at once (cached briefly across reruns)
+@st.cache_data(ttl=5, show_spinner=False)
+def batch_quotes(symbols):
+    """
+    Fetches quotes for several symbols with a single request to Yahoo's quote endpoint.
+    Symbols missing from the batched response fall back to yf.Ticker(...).info, fetched concurrently.
+    Args:
+        symbols (list[str]): The Yahoo Finance ticker symbols.
+    Returns:
+        dict[str, dict]: Quote fields keyed by symbol, using the same keys as yf.Ticker(...).info.
+    """
+    symbols = list(dict.fromkeys(symbols))  # De-duplicate, keep order
+    quotes = {}
+    if not symbols:
+        return quotes
+
+    try:
+        response = _HTTP.get(
+            QUOTE_URL,
+            params={"symbols": ",".join(symbols), "fields": ",".join(QUOTE_FIELDS.values())}
+        )
+        response.raise_for_status()
+        for item in response.json()["quoteResponse"]["result"]:
+            quotes[item["symbol"]] = {key: item.get(field) for key, field in QUOTE_FIELDS.items()}
+    except Exception as e:
+        print(f"[ERROR] Batch quote fetch failed: {e}")
+
+    missing = [symbol for symbol in symbols if symbol not in quotes]
+    if missing:
+        quotes.update(asyncio.run(gather_all(missing)))
+    return quotes
+
+def info_quote(symbol):
+    """Fetches the quote fields for a single symbol from yf.Ticker(...).info."""
+    try:
+        info = yf.Ticker(symbol).info
+        return {key: info.get(key) for key in QUOTE_FIELDS}
+    except Exception:
+        return {}
+
+async def fetch_quote(semaphore, symbol):
+    """Runs info_quote in a worker thread, bounded by the shared semaphore."""
+    async with semaphore:
+        return await asyncio.to_thread(info_quote, symbol)
+
+async def gather_all(symbols):
+    """
+    Fetches quotes for several symbols concurrently via yfinance.
+    Args:
+        symbols (list[str]): The Yahoo Finance ticker symbols.
+    Returns:
+        dict[str, dict]: Quote fields keyed by symbol.
+    """
+    semaphore = asyncio.Semaphore(32)
+    results = await asyncio.gather(*(fetch_quote(semaphore, symbol) for symbol in symbols))
+    return dict(zip(symbols, results))
+
+# --- Scrip code for display, i.e. the ticker without its ".BO" exchange suffix
+def scrip_code(ticker):
+    """Returns ticker without a trailing ".BO" suffix."""
+    return ticker[:-3] if ticker.endswith(".BO") else ticker
+
+# --- Stock names don't change, so keep every name found for a day
+@st.cache_resource(ttl=86400, show_spinner=False)
+def _short_names():
+    """Returns the shared symbol -> shortName map of names found so far."""
+    return {}
+
+def ticker_short_name(sym, quotes):
+    """
+    Returns the stock's short name, or its scrip code if the name is unavailable.
+    Args:
+        sym (str): The Yahoo Finance ticker symbol.
+        quotes (dict[str, dict]): Quotes from batch_quotes; names found there are remembered.
+    """
+    names = _short_names()
+    name = quotes.get(sym, {}).get("shortName")
+    if name:
+        names[sym] = name
+    return names.get(sym) or scrip_code(sym)
 
 # --- Fetch Top Scripts in View Info Tab
+# First five data rows of the page's first table (row 1 is the header), and the first three cells of a row
+_TABLE_XPATH = html.etree.XPath("(//table)[1]")
+_ROW_XPATH = html.etree.XPath("(.//tr)[position()>1 and position()<=6]")
+_CELL_XPATH = html.etree.XPath("td[position()<=3]")
+
 def fetch_from_screener(url):
     """
     Fetches stock data (Top Gainers, Losers, etc.) from screener.in.
@@ -47,18 +272,24 @@ def fetch_from_screener(url):
     Returns:
         pd.DataFrame: A DataFrame containing the top 5 stocks, or None if fetching fails.
     """
-    headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.find("table")
-        if not table:
+        response = _HTTP.get(url)
+        tree = html.fromstring(response.content)
+        tables = _TABLE_XPATH(tree)
+        if not tables:
             print("[ERROR] Table not found.")
             return None
-        df = pd.read_html(str(table))[0]
-        df = df.iloc[:, :3]
-        df.columns = ["Stock", "LTP ($)", "% Change"]
-        return df.head(5)
+        rows = []
+        for tr in _ROW_XPATH(tables[0]):
+            cells = [td.text_content().strip() for td in _CELL_XPATH(tr)]
+            rows.append(cells + [None] * (3 - len(cells)))  # Pad short rows, as pd.read_html did
+        df = pd.DataFrame(rows, columns=["Stock", "LTP ($)", "% Change"])
+        # Like pd.read_html, make a column numeric only when every value in it parses as a number
+        for col in df.columns:
+            numeric = pd.to_numeric(df[col].str.replace(",", "", regex=False), errors="coerce")
+            if numeric.notna().sum() == df[col].notna().sum():
+                df[col] = numeric
+        return df
     except Exception as e:
         print(f"[ERROR] Screener fetch failed: {e}")
         return None
@@ -83,6 +314,97 @@ def fetch_top_turnover():
     """Fetches stocks with top turnover."""
     return fetch_from_screener("https://www.screener.in/screens/326010/top-turnover/")
 
+class ScreenerFetchError(Exception):
+    """Raised when some mover tables could not be fetched; tables holds the partial result."""
+    def __init__(self, tables):
+        super().__init__("Some screener tables could not be fetched.")
+        self.tables = tables
+
+# Fetch all four mover tables at once; screener pages change slowly, so cache them
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_market_movers():
+    """
+    Fetches the top gainers, losers, trending and turnover tables concurrently.
+    Returns:
+        tuple: (gainers, losers, trending, turnover) DataFrames.
+    Raises:
+        ScreenerFetchError: If any table failed, so the failure isn't cached and the next run retries.
+    """
+    fetchers = [fetch_top_gainers, fetch_top_losers, fetch_trending_stocks, fetch_top_turnover]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(fetchers)) as ex:
+        tables = tuple(ex.map(lambda fetch: fetch(), fetchers))
+    if any(df is None for df in tables):
+        raise ScreenerFetchError(tables)
+    return tables
+
+def prefetch_market_movers():
+    """Warms the fetch_market_movers cache; failures are left for the View tab to retry and report."""
+    try:
+        fetch_market_movers()
+    except ScreenerFetchError:
+        pass
+
+def refresh_prices():
+    """Drops cached quotes and mover tables so the next run fetches fresh ones."""
+    batch_quotes.clear()
+    fetch_market_movers.clear()
+
+# Historical data only depends on symbol and period, so chart-type toggles reuse it
+@st.cache_data(ttl=600, show_spinner=False)
+def _hist(sym, period):
+    """Fetches daily OHLC history for sym over period."""
+    return yf.Ticker(sym).history(period=period, interval="1d")  # Force daily interval for better support
+
+def render_live_prices(symbols):
+    """
+    Embeds a small browser-side client that subscribes to the backend's /ws/ltp channel
+    and updates prices in place as they are pushed, without rerunning the script.
+    Args:
+        symbols (list[str]): The Yahoo Finance ticker symbols to stream.
+    """
+    # Safe to embed in <script>: a "</" inside a symbol can't close the tag early
+    symbols_js = json.dumps(symbols).replace("</", "<\\/")
+    rows = -(-(len(symbols) + 1) // LIVE_QUOTES_PER_ROW)  # +1 for the status indicator
+    cells = "".join(
+        f'<span class="quote"><b>{html_escape(scrip_code(s))}</b> ₹<span data-symbol="{html_escape(s)}">…</span></span>'
+        for s in symbols
+    )
+    components.html(f"""
+<style>
+  body {{ margin: 0; font-family: "Source Sans Pro", sans-serif; font-size: 15px; }}
+  .strip {{ display: flex; flex-wrap: wrap; row-gap: 6px; }}
+  .quote {{ margin-right: 1.5em; white-space: nowrap; }}
+  #status {{ margin-right: 1.5em; color: #888; font-size: 12px; align-self: center; }}
+</style>
+<div class="strip"><span id="status">connecting…</span>{cells}</div>
+<script>
+  const statusEl = document.getElementById("status");
+  let retryDelay = 1000;  // Doubles after each failed attempt, up to 30 s
+
+  function connect() {{
+    const ws = new WebSocket({json.dumps(LTP_WS_URL)});
+    ws.onopen = () => {{
+      retryDelay = 1000;
+      statusEl.textContent = "● live";
+      ws.send(JSON.stringify({{action: "subscribe", symbols: {symbols_js}}}));
+    }};
+    ws.onmessage = (event) => {{
+      const changed = JSON.parse(event.data);
+      document.querySelectorAll("[data-symbol]").forEach((el) => {{
+        const price = changed[el.dataset.symbol];
+        if (price !== undefined) el.textContent = Number(price).toFixed(2);
+      }});
+    }};
+    ws.onclose = () => {{
+      statusEl.textContent = `○ offline, retrying in ${{retryDelay / 1000}}s`;
+      setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    }};
+  }}
+  connect();
+</script>
+""", height=28 * rows + 4, scrolling=True)
+
 def render_stock_chart(ticker_symbol, period="1mo", chart_type="Line"):
     """
     Renders a historical stock chart using Plotly.
@@ -92,13 +414,18 @@ def render_stock_chart(ticker_symbol, period="1mo", chart_type="Line"):
         chart_type (str): "Line" or "Candlestick".
     """
     try:
-        stock = yf.Ticker(ticker_symbol)
-        hist = stock.history(period=period, interval="1d")  # Force daily interval for better support
+        hist = _hist(ticker_symbol, period)
 
         if hist.empty or "Close" not in hist:
             st.warning("⚠️ No historical chart data found for this stock.")
             return
 
+        # Thin out long series by taking every n-th row so the chart payload stays small.
+        # Step back from the end so the latest bar is always kept.
+        if len(hist) > MAX_CHART_POINTS:
+            step = -(-len(hist) // MAX_CHART_POINTS)
+            hist = hist.iloc[::-step].iloc[::-1]
+
         fig = go.Figure()
 
         if chart_type == "Line":
@@ -131,80 +458,75 @@ st.title("📈 BSE Dummy Trading App")
 balance_slot = st.empty()
 
 # --- Load persistent data or initialize
-if "portfolio" not in st.session_state:
-    if os.path.exists(PORTFOLIO_FILE):
-        with open(PORTFOLIO_FILE, "r") as f:
-            st.session_state.portfolio = json.load(f)
-    else:
-        st.session_state.portfolio = {}
-
-if "balance" not in st.session_state:
-    if os.path.exists(BALANCE_FILE):
-        with open(BALANCE_FILE, "r") as f:
-            st.session_state.balance = float(f.read())
-    else:
-        st.session_state.balance = 1000000.0  # ₹10 Lakhs default
-
+if "portfolio" not in st.session_state or "balance" not in st.session_state:
+    st.session_state.portfolio, st.session_state.balance = load_session()
+
+# --- Start fetching the View tab's market movers in the background on first load,
+# so the four screener requests overlap with the quote pre-pass below
+if "prefetch" not in st.session_state:
+    prefetch = threading.Thread(target=prefetch_market_movers, daemon=True)
+    add_script_run_ctx(prefetch)  # Lets the thread fill the shared st.cache_data entry
+    prefetch.start()
+    st.session_state.prefetch = prefetch
+
+# --- Fetch every quote needed for this run in one request
+limit_orders = load_limit_orders()
+trade_input = st.session_state.get("trade")  # The trade tab's symbol, already set when its input triggers the rerun
+quotes = batch_quotes(
+    st.session_state.portfolio.index.tolist()
+    + [o["ticker"] for o in limit_orders]
+    + list(index_tickers.values())
+    + ([f"{trade_input.strip().upper()}.BO"] if trade_input else [])
+)
 
 # --- Execute any matching limit orders
 # This function is now ONLY called by the new "Execute Pending Limit Orders" button
-def process_limit_orders():
+def process_limit_orders(orders, quotes):
     """
     Checks all pending limit orders and executes them if their conditions are met.
     Updates portfolio, balance, and saves remaining orders.
+    Args:
+        orders (list[dict]): The pending limit orders, as returned by load_limit_orders.
+        quotes (dict[str, dict]): Quotes from batch_quotes covering every pending order's ticker.
     """
-    orders = load_limit_orders()
-    remaining = []
-    changed = False
-
-    for order in orders:
+    # Check every order's limit condition at once. A missing LTP becomes NaN,
+    # which fails both comparisons, so that order stays pending.
+    prices = [quotes.get(o["ticker"], {}).get("regularMarketPrice") for o in orders]
+    ltps = np.array([np.nan if p is None else p for p in prices], dtype=float)
+    targets = np.array([o["target_price"] for o in orders], dtype=float)
+    is_buy = np.array([o["action"] == "buy" for o in orders], dtype=bool)
+    qualifies = (is_buy & (ltps <= targets)) | (~is_buy & (ltps >= targets))
+
+    executed = set()
+    for i in np.flatnonzero(qualifies):
+        order = orders[i]
         ticker = order["ticker"]
+        code = order.get("code") or scrip_code(ticker)
         qty = order["qty"]
-        action = order["action"]
-        target_price = order["target_price"]
-
-        stock = yf.Ticker(ticker)
-        ltp = stock.info.get("regularMarketPrice", None)
-
-        if ltp is None:
-            # If LTP cannot be fetched, keep the order pending
-            remaining.append(order)
-            continue
-
-        # Check if the limit order condition is met
-        if (action == "buy" and ltp <= target_price) or \
-           (action == "sell" and ltp >= target_price):
-            
-            p = st.session_state.portfolio.get(ticker, {"qty": 0, "avg_price": 0})
-            
-            if action == "buy":
-                cost = qty * ltp
-                if cost <= st.session_state.balance:
-                    new_qty = p["qty"] + qty
-                    new_avg = (p["qty"] * p["avg_price"] + qty * ltp) / new_qty
-                    st.session_state.portfolio[ticker] = {"qty": new_qty, "avg_price": new_avg}
-                    st.session_state.balance -= cost
-                    changed = True
-                    st.toast(f"Executed BUY {qty} of {ticker.replace('.BO', '')} at ₹{ltp:.2f} (Limit Order)", icon="✅")
-                else:
-                    # Not enough balance, keep the order pending
-                    remaining.append(order)
-            elif action == "sell":
-                if p["qty"] >= qty:
-                    p["qty"] -= qty
-                    if p["qty"] > 0:
-                        st.session_state.portfolio[ticker] = p
-                    else:
-                        del st.session_state.portfolio[ticker]
-                    st.session_state.balance += qty * ltp
-                    changed = True
-                    st.toast(f"Executed SELL {qty} of {ticker.replace('.BO', '')} at ₹{ltp:.2f} (Limit Order)", icon="✅")
-                else:
-                    # Not enough shares to sell, keep the order pending
-                    remaining.append(order)
+        ltp = float(ltps[i])
+
+        held_qty, held_avg = get_holding(ticker)
+
+        if is_buy[i]:
+            cost = qty * ltp
+            if cost <= st.session_state.balance:
+                new_qty = held_qty + qty
+                new_avg = (held_qty * held_avg + qty * ltp) / new_qty
+                set_holding(ticker, new_qty, new_avg)
+                st.session_state.balance -= cost
+                executed.add(i)
+                st.toast(f"Executed BUY {qty} of {code} at ₹{ltp:.2f} (Limit Order)", icon="✅")
+            # Otherwise not enough balance, keep the order pending
         else:
-            # Condition not met, keep the order pending
-            remaining.append(order)
+            if held_qty >= qty:
+                set_holding(ticker, held_qty - qty, held_avg)
+                st.session_state.balance += qty * ltp
+                executed.add(i)
+                st.toast(f"Executed SELL {qty} of {code} at ₹{ltp:.2f} (Limit Order)", icon="✅")
+            # Otherwise not enough shares to sell, keep the order pending
+
+    remaining = [order for i, order in enumerate(orders) if i not in executed]
+    changed = bool(executed)
 
     if changed:
         save_session()
@@ -217,10 +539,12 @@ with st.sidebar:
     col1, col2 = st.columns(2)
 
     if col1.button("🔁 Reset Portfolio"):
-        st.session_state.portfolio = {}
+        st.session_state.portfolio = empty_portfolio()
         st.session_state.balance = 1000000.0
         save_session()
         # Remove files to ensure a clean reset
+        st.session_state.pop("_last_saved_hash", None)
+        if os.path.exists(STATE_FILE): os.remove(STATE_FILE)
         if os.path.exists(PORTFOLIO_FILE): os.remove(PORTFOLIO_FILE)
         if os.path.exists(BALANCE_FILE): os.remove(BALANCE_FILE)
         if os.path.exists(LIMIT_ORDER_FILE): os.remove(LIMIT_ORDER_FILE)
@@ -228,7 +552,8 @@ with st.sidebar:
         st.success("Portfolio has been reset to ₹10,00,000. Interact with the app to see changes.")
 
 
-    if col2.button("🔄 Refresh Prices"):
+    # The callback clears cached data before the rerun, so the pre-pass above fetches fresh quotes
+    if col2.button("🔄 Refresh Prices", on_click=refresh_prices):
         # This button now ONLY refreshes prices and UI, does NOT execute limit orders
         st.toast("Market prices refreshed.", icon="✅")
         st.success("Market prices have been refreshed. Check 'Pending Trades' tab and click 'Execute Pending Limit Orders at Market Price' to process.")
@@ -248,28 +573,23 @@ view_tab, trade_tab, portfolio_tab, pending_tab = st.tabs([
 with portfolio_tab:
     st.subheader("📁 My Saved Portfolio")
 
-    if st.session_state.portfolio:
-        df = pd.DataFrame.from_dict(st.session_state.portfolio, orient="index")
-        # Fetch current prices for portfolio holdings
-        current_prices = {}
-        for symbol in df.index:
-            try:
-                stock = yf.Ticker(symbol)
-                current_prices[symbol] = stock.info.get("regularMarketPrice", 0)
-            except Exception:
-                current_prices[symbol] = 0 # Default to 0 if price fetch fails
-
-        df["Current Price"] = df.index.map(lambda s: current_prices.get(s, 0))
-        df["Value"] = df["qty"] * df["Current Price"]
-        df["P/L"] = (df["Current Price"] - df["avg_price"]) * df["qty"]
+    if not st.session_state.portfolio.empty:
+        df = st.session_state.portfolio.copy()
+        # Current prices come from the batched quote pre-pass
+        prices = {symbol: q.get("regularMarketPrice") for symbol, q in quotes.items()}
+        df["Current Price"] = df.index.to_series().map(prices).fillna(0).to_numpy(dtype=float)
+        df["Value"] = df["qty"].values * df["Current Price"].values
+        df["P/L"] = (df["Current Price"].values - df["avg_price"].values) * df["qty"].values
 
+        st.caption("Live prices, streamed separately. Current Price, Value and P/L in the table are as of the last refresh.")
+        render_live_prices(df.index.tolist())
         st.dataframe(df.style.format("{:.2f}"))
     else:
         st.info("Your portfolio is currently empty.")
 
 with pending_tab:
     st.subheader("📋 Pending Limit Orders")
-    limit_orders = load_limit_orders()
+    limit_orders = load_limit_orders()  # Only re-parses if the file changed since the pre-pass
 
     if limit_orders:
         data = []
@@ -280,8 +600,8 @@ with pending_tab:
             target_price = order["target_price"]
             
             # Attempt to get stock name, default to ticker if not found
-            stock_name = yf.Ticker(ticker).info.get("shortName", ticker.replace(".BO", ""))
-            code = ticker.replace(".BO", "")
+            stock_name = ticker_short_name(ticker, quotes)
+            code = order.get("code") or scrip_code(ticker)
             
             data.append({
                 "Stock Name": stock_name,
@@ -301,7 +621,7 @@ with pending_tab:
         st.markdown("---")
         # New button to explicitly execute pending limit orders
         if st.button("🚀 Execute Pending Limit Orders", help="Click to check and execute any limit orders that have met their price conditions."):
-            executed_any = process_limit_orders()
+            executed_any = process_limit_orders(limit_orders, quotes)
             if executed_any:
                 st.success("Successfully executed pending limit orders!")
             else:
@@ -322,8 +642,7 @@ with view_tab:
         Returns:
             tuple: (current_price, change, percentage_change) or None if data is unavailable.
         """
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
+        info = quotes.get(ticker_symbol, {})
         current = info.get("regularMarketPrice", None)
         prev = info.get("previousClose", None)
         if current is not None and prev is not None:
@@ -332,12 +651,6 @@ with view_tab:
             return round(current, 2), round(chg, 2), round(pct, 2)
         return None
 
-    index_tickers = {
-        "Sensex": "^BSESN",
-        "Sensex 50": "^NSEI", # Nifty 50 is often used as a proxy for Sensex 50 in Yahoo Finance
-        "BSE Bankex": "^BSEBANK"
-    }
-
     cols = st.columns(len(index_tickers))
     for i, (name, symbol) in enumerate(index_tickers.items()):
         result = get_index_data(symbol)
@@ -351,18 +664,26 @@ with view_tab:
     
     st.subheader("🏆 Top Market Movers")
 
+    if st.session_state.prefetch.is_alive():
+        with st.spinner("Loading market movers..."):
+            st.session_state.prefetch.join()
+    try:
+        gainers, losers, trending, turnover = fetch_market_movers()  # Served from the cache the prefetch filled
+    except ScreenerFetchError as e:
+        gainers, losers, trending, turnover = e.tables  # Show what did load; the next run retries
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("#### 🔼 Top Gainers")
-        df = fetch_top_gainers()
+        df = gainers
         if df is not None:
             st.dataframe(df)
         else:
             st.warning("Could not fetch top gainers.")
 
         st.markdown("#### 🔁 Trending Stocks")
-        df = fetch_trending_stocks()
+        df = trending
         if df is not None:
             st.dataframe(df)
         else:
@@ -370,14 +691,14 @@ with view_tab:
 
     with col2:
         st.markdown("#### 🔽 Top Losers")
-        df = fetch_top_losers()
+        df = losers
         if df is not None:
            st.dataframe(df)
         else:
             st.warning("Could not fetch top losers.")
 
         st.markdown("#### 💰 Top Turnover")
-        df = fetch_top_turnover()
+        df = turnover
         if df is not None:
             st.dataframe(df)
         else:
@@ -391,11 +712,11 @@ with trade_tab:
     
     # Only proceed if user has entered something
     if user_input:
-        ticker = f"{user_input.strip().upper()}.BO"
+        code = user_input.strip().upper()
+        ticker = f"{code}.BO"
 
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = quotes.get(ticker, {})  # Fetched in the pre-pass
             # Ensure we have a valid market price
             if 'regularMarketPrice' not in info or info['regularMarketPrice'] is None:
                 st.warning(f"❌ Could not fetch live price for {ticker}. Please check the symbol.")
@@ -418,6 +739,9 @@ with trade_tab:
             col3.metric("Day Low", f"₹{info.get('dayLow', 'N/A'):.2f}" if info.get('dayLow') else "N/A")
             col4.metric("Previous Close", f"₹{info.get('previousClose', 'N/A'):.2f}" if info.get('previousClose') else "N/A")
 
+            st.caption("Live LTP, streamed separately. Trades execute at the Last Traded Price above, as of the last refresh.")
+            render_live_prices([symbol])
+
             col5, col6 = st.columns(2)
             col5.metric("52 Week High", f"₹{info.get('fiftyTwoWeekHigh', 'N/A'):.2f}" if info.get('fiftyTwoWeekHigh') else "N/A")
             col6.metric("52 Week Low", f"₹{info.get('fiftyTwoWeekLow', 'N/A'):.2f}" if info.get('fiftyTwoWeekLow') else "N/A")
@@ -449,18 +773,19 @@ with trade_tab:
                         orders = load_limit_orders()
                         orders.append({
                             "ticker": symbol,
+                            "code": code,
                             "action": action.lower(),
                             "qty": qty,
                             "target_price": target_price
                         })
                         save_limit_orders(orders)
-                        st.toast(f"Limit {action} order placed for {qty} shares of {symbol.replace('.BO', '')} at ₹{target_price:.2f}. Check 'Pending Trades' tab.", icon="✅")
-                        st.success(f"Limit {action} order placed for {qty} shares of {symbol.replace('.BO', '')} at ₹{target_price:.2f}. This order is now pending in 'Pending Trades' tab.")
+                        st.toast(f"Limit {action} order placed for {qty} shares of {code} at ₹{target_price:.2f}. Check 'Pending Trades' tab.", icon="✅")
+                        st.success(f"Limit {action} order placed for {qty} shares of {code} at ₹{target_price:.2f}. This order is now pending in 'Pending Trades' tab.")
 
 
                     elif order_type.lower() == "market":
                         # Execute immediately for market orders
-                        holdings = st.session_state.portfolio.get(symbol, {"qty": 0, "avg_price": 0})
+                        held_qty, held_avg = get_holding(symbol)
 
                         if action == "Buy":
                             cost = qty * ltp
@@ -468,28 +793,24 @@ with trade_tab:
                                 st.toast("Insufficient balance.", icon="⚠️")
                                 st.error("Insufficient balance.")
                             else:
-                                new_qty = holdings["qty"] + qty
-                                new_avg = (holdings["qty"] * holdings["avg_price"] + qty * ltp) / new_qty
-                                st.session_state.portfolio[symbol] = {"qty": new_qty, "avg_price": new_avg}
+                                new_qty = held_qty + qty
+                                new_avg = (held_qty * held_avg + qty * ltp) / new_qty
+                                set_holding(symbol, new_qty, new_avg)
                                 st.session_state.balance -= cost
                                 save_session()
-                                st.toast(f"Bought {qty} shares of {symbol.replace('.BO', '')} at ₹{ltp:.2f}.", icon="✅")
-                                st.success(f"Bought {qty} shares of {symbol.replace('.BO', '')} at ₹{ltp:.2f}.")
+                                st.toast(f"Bought {qty} shares of {code} at ₹{ltp:.2f}.", icon="✅")
+                                st.success(f"Bought {qty} shares of {code} at ₹{ltp:.2f}.")
 
 
                         elif action == "Sell":
-                            if qty > holdings["qty"]:
+                            if qty > held_qty:
                                 st.toast("Not enough shares to sell.", icon="⚠️")
                                 st.error("Not enough shares to sell.")
                             else:
-                                holdings["qty"] -= qty
-                                if holdings["qty"] == 0:
-                                    del st.session_state.portfolio[symbol]
-                                else:
-                                    st.session_state.portfolio[symbol] = holdings
+                                set_holding(symbol, held_qty - qty, held_avg)
                                 st.session_state.balance += qty * ltp
                                 save_session()
-                                st.toast(f"Sold {qty} shares of {symbol.replace('.BO', '')} at ₹{ltp:.2f}.", icon="✅")
-                                st.success(f"Sold {qty} shares of {symbol.replace('.BO', '')} at ₹{ltp:.2f}.")
+                                st.toast(f"Sold {qty} shares of {code} at ₹{ltp:.2f}.", icon="✅")
+                                st.success(f"Sold {qty} shares of {code} at ₹{ltp:.2f}.")
     else:
         st.info("Please enter a stock symbol to view details and trade.")
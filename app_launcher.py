@@ -1,9 +1,9 @@
 import os
+import socket
 import subprocess
 import threading
 import time
 import webview
-import requests
 
 
 
@@ -13,7 +13,7 @@ os.chdir(base_path)
 # Launch backend (FastAPI)
 def start_backend():
     subprocess.Popen(
-        ["uvicorn", "backend:app", "--host", "127.0.0.1", "--port", "8000"],
+        ["uvicorn", "BE:app", "--host", "127.0.0.1", "--port", "8000"],
         cwd=base_path,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL
@@ -28,17 +28,15 @@ def start_frontend():
         stderr=subprocess.DEVNULL
     )
 
-# Check if Streamlit is live
-def wait_for_streamlit():
-    max_tries = 20
-    for _ in range(max_tries):
-        try:
-            r = requests.get("http://127.0.0.1:8501")
-            if r.status_code == 200:
+# Check if Streamlit is live by probing its port with a plain TCP connect
+def wait_for_streamlit(timeout=20):
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        with socket.socket() as sock:
+            sock.settimeout(0.1)
+            if sock.connect_ex(("127.0.0.1", 8501)) == 0:
                 return True
-        except requests.ConnectionError:
-            pass
-        time.sleep(1)
+        time.sleep(0.1)
     return False
 
 # Start both in background threads